@@ -1,27 +1,36 @@
 """
 TDS Project 2: LLM Analysis Quiz Solver
-Flask API server that receives quiz URLs and solves them using LLMs
+Quart API server that receives quiz URLs and solves them using LLMs
 """
 
-from flask import Flask, request, jsonify, render_template_string
+from quart import Quart, Response, request, render_template_string
 import os
+import hmac
 import asyncio
+import orjson
 from dotenv import load_dotenv
 from quiz_solver import QuizSolver
 import logging
 
 load_dotenv()
 
-app = Flask(__name__)
+app = Quart(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration from environment variables
 SECRET = os.getenv('SECRET_KEY', 'your-secret-here')
+SECRET_BYTES = SECRET.encode('utf-8')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
 quiz_solver = QuizSolver(OPENAI_API_KEY)
 
+
+@app.after_serving
+async def shutdown_solver():
+    """Release the solver's HTTP session, browser and OpenAI client"""
+    await quiz_solver.aclose()
+
 HOME_PAGE = """
 <!DOCTYPE html>
 <html>
@@ -182,20 +191,32 @@ HOME_PAGE = """
 </html>
 """
 
+def json_response(payload, status=200):
+    """Serialize a payload with orjson into a JSON response"""
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
+
+# Rendered on first access, since the page never changes while serving
+HOME_PAGE_RENDERED = None
+
+
 @app.route('/', methods=['GET'])
-def home():
+async def home():
     """Home page with API documentation"""
-    return render_template_string(HOME_PAGE, secret=SECRET[:10] + "...")
+    global HOME_PAGE_RENDERED
+    if HOME_PAGE_RENDERED is None:
+        HOME_PAGE_RENDERED = await render_template_string(HOME_PAGE, secret=SECRET[:10] + "...")
+    return HOME_PAGE_RENDERED
 
 
 @app.route('/health', methods=['GET'])
-def health():
+async def health():
     """Health check endpoint"""
-    return jsonify({"status": "healthy"}), 200
+    return json_response({"status": "healthy"})
 
 
 @app.route('/quiz', methods=['POST'])
-def handle_quiz():
+async def handle_quiz():
     """
     Main endpoint to receive and solve quiz tasks
     Expected payload:
@@ -207,11 +228,14 @@ def handle_quiz():
     """
     try:
         # Parse JSON payload
-        data = request.get_json()
+        try:
+            data = orjson.loads(await request.get_data())
+        except orjson.JSONDecodeError:
+            data = None
 
         if not data:
             logger.error("Invalid JSON payload")
-            return jsonify({"error": "Invalid JSON"}), 400
+            return json_response({"error": "Invalid JSON"}, 400)
 
         # Validate required fields
         email = data.get('email')
@@ -220,35 +244,36 @@ def handle_quiz():
 
         if not all([email, secret, url]):
             logger.error("Missing required fields")
-            return jsonify({"error": "Missing required fields: email, secret, url"}), 400
+            return json_response({"error": "Missing required fields: email, secret, url"}, 400)
 
         # Verify secret
-        if secret != SECRET:
-            logger.error(f"Invalid secret provided: {secret}")
-            return jsonify({"error": "Invalid secret"}), 403
+        if not isinstance(secret, str) or not hmac.compare_digest(secret.encode('utf-8'), SECRET_BYTES):
+            logger.error("Invalid secret provided: %s", secret)
+            return json_response({"error": "Invalid secret"}, 403)
 
         # Log the request
-        logger.info(f"Received quiz request for: {url}")
+        logger.info("Received quiz request for: %s", url)
 
         # Solve the quiz asynchronously
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(quiz_solver.solve_quiz_chain(email, secret, url))
-        loop.close()
+        result = await asyncio.wait_for(quiz_solver.solve_quiz_chain(email, secret, url), timeout=200)
 
-        logger.info(f"Quiz solved successfully: {result}")
+        logger.info("Quiz solved successfully: %d results", len(result))
+        logger.debug("Quiz chain results: %r", result)
 
-        return jsonify({
+        return json_response({
             "status": "success",
             "message": "Quiz processing started",
             "initial_url": url
-        }), 200
+        })
 
     except Exception as e:
-        logger.error(f"Error handling quiz: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        logger.error("Error handling quiz: %s", e)
+        return json_response({"error": str(e)}, 500)
 
 
 if __name__ == '__main__':
+    import uvicorn
+
     port = int(os.getenv('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)
+    # 'auto' picks uvloop whenever it is installed
+    uvicorn.run(app, host='0.0.0.0', port=port, loop='auto', http='h11')
@@ -2,57 +2,349 @@
 Quiz Solver: Handles quiz rendering, parsing, and solving
 """
 
+import os
 import asyncio
 import aiohttp
+import aiofiles
+import re
 import json
+import orjson
 import logging
-import base64
-from playwright.async_api import async_playwright
-from openai import OpenAI
+import pybase64
+import hashlib
+import uuid
+import threading
+import io
+import pypdfium2
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from collections import OrderedDict
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from openai import AsyncOpenAI
 import time
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Patterns used by format_answer, built once at import
+_NUM_RE = re.compile(r'-?\d+\.?\d*')
+_TRUE_WORDS = ('true', 'yes')
+_FALSE_WORDS = ('false', 'no')
+_WHITESPACE_RE = re.compile(r'\s+')
+_URL_RE = re.compile(r'\S*https?://\S+')
+_SUBMIT_WINDOW_RE = re.compile(r'.{0,80}submit.{0,80}', re.IGNORECASE)
+
+# Upper bound on page text sent to the parsing LLM
+MAX_PAGE_TEXT_CHARS = 6000
+
+# PDF text sent to the solver is capped; shorter extractions are treated as scanned pages
+MAX_PDF_TEXT_CHARS = 16000
+MIN_PDF_TEXT_CHARS = 200
+MAX_PDF_IMAGE_PAGES = 5
+# pdfium is not thread-safe, so PDF work in worker threads runs one document at a time
+_PDFIUM_LOCK = threading.Lock()
+
+# CSVs larger than this are summarised instead of sent verbatim
+MAX_RAW_CSV_CHARS = 16000
+CSV_HEAD_ROWS = 20
+
+# Cosine similarity above which a previously solved question is reused
+SEMANTIC_CACHE_THRESHOLD = 0.92
+MAX_ANSWERS_PER_CACHE_KEY = 32
+
+# Downloads larger than this are refused rather than buffered in memory
+MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+# Cached downloads beyond this total are evicted, least recently used first
+MAX_CACHE_BYTES = 500 * 1024 * 1024
+
+# Number of warm browser contexts kept for rendering quiz pages
+CONTEXT_POOL_SIZE = 2
+# How long a render waits for a free context before giving up
+CONTEXT_WAIT_SECONDS = 30
+
+# Run before a pooled page closes, so the next quiz starts with empty web storage
+CLEAR_STORAGE_SCRIPT = "() => { try { localStorage.clear(); sessionStorage.clear(); } catch (e) {} }"
+
+# Resource types that never affect the quiz text, so the browser skips them
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet'}
+
+
+class LRUCache:
+    """Small bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._data = OrderedDict()
+
+    def get(self, key):
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        return self._data.pop(key, None)
+
+
+class CallCoalescer:
+    """
+    Runs LLM calls under a concurrency cap
+    Concurrent callers with the same key share one in-flight call instead of sending duplicates
+    """
+
+    def __init__(self, max_concurrency=10):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight = {}
+
+    async def submit(self, key, call):
+        """
+        Run `call` (a zero-argument coroutine function), or join the in-flight call for `key`
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(call))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            logger.info("Joining in-flight LLM call")
+
+        # Shielded so one caller giving up does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _run(self, call):
+        async with self._semaphore:
+            return await call()
+
+    def _finish(self, key, task):
+        self._inflight.pop(key, None)
+        # Mark the error as retrieved in case every caller has already gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def aclose(self):
+        """Cancel and wait for any calls still in flight"""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _dumps_json(obj):
+    """Serialize with orjson, falling back to json for integers beyond 64 bits"""
+    try:
+        return orjson.dumps(obj).decode('utf-8')
+    except TypeError:
+        return json.dumps(obj)
+
+
+def _trim_page_text(text, max_chars=MAX_PAGE_TEXT_CHARS):
+    """
+    Collapse whitespace, drop blank lines and cap the length at max_chars
+    Repeated lines are kept, since they may be quiz data; long pages keep their
+    start and end, plus any URLs and "submit" mentions from the middle
+    """
+    lines = (_WHITESPACE_RE.sub(' ', line).strip() for line in text.splitlines())
+    text = '\n'.join(line for line in lines if line)
+    if len(text) <= max_chars:
+        return text
+
+    # Submit URLs and file links often sit at the end or in the middle of the page
+    url_budget = max_chars // 4
+    edge_chars = (max_chars - url_budget) // 2
+    middle = text[edge_chars:len(text) - edge_chars]
+    snippets = []
+    used = 0
+    for snippet in dict.fromkeys(_URL_RE.findall(middle) + _SUBMIT_WINDOW_RE.findall(middle)):
+        if used + len(snippet) + 1 > url_budget:
+            break
+        snippets.append(snippet)
+        used += len(snippet) + 1
+
+    omitted = '[...]\n' + '\n'.join(snippets) + '\n[...]' if snippets else '[...]'
+    # Whatever the snippets leave unused goes to the start and end of the page
+    remaining = max_chars - len(omitted) - 2
+    head_chars = remaining // 2
+    tail_chars = remaining - head_chars
+    return f"{text[:head_chars]}\n{omitted}\n{text[len(text) - tail_chars:]}"
+
+
+async def _block_heavy_resources(route):
+    """Abort requests for resources the solver does not need"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
 
 class QuizSolver:
-    def __init__(self, openai_api_key):
-        self.openai_client = OpenAI(api_key=openai_api_key)
+    def __init__(self, openai_api_key, cache_dir='.cache/downloads'):
+        self.openai_client = AsyncOpenAI(api_key=openai_api_key)
         self.max_time = 180  # 3 minutes in seconds
+        self.cache_dir = cache_dir
+        self._session = None
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = asyncio.Lock()
+        self._context_pool = None
+        self._render_cache = LRUCache()
+        self._parse_cache = LRUCache()
+        # Maps a digest of (answer format, files) to (embedding rows, graded-correct answers)
+        self._answer_cache = LRUCache()
+        self._parse_calls = CallCoalescer()
+
+    async def _get_session(self):
+        """
+        Return the shared aiohttp session, creating it on first use
+        Reusing one session keeps connections alive across the quiz chain
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=30),
+                json_serialize=_dumps_json
+            )
+        return self._session
+
+    async def _ensure_browser(self):
+        """
+        Launch Playwright and Chromium once and return the shared browser
+        Also fills the pool of warm contexts that render_page draws from
+        """
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=True,
+                    args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu']
+                )
+
+                self._context_pool = asyncio.Queue(maxsize=CONTEXT_POOL_SIZE)
+                for _ in range(CONTEXT_POOL_SIZE):
+                    self._context_pool.put_nowait(await self._new_pooled_context())
+            return self._browser
+
+    async def _new_pooled_context(self):
+        """Create a browser context with the resource blocking route installed"""
+        context = await self._browser.new_context()
+        await context.route('**/*', _block_heavy_resources)
+        return context
+
+    async def _replace_context(self, context_pool, context):
+        """Close a context that is no longer trustworthy and put a fresh one in the pool"""
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning("Could not close broken browser context: %s", e)
+
+        try:
+            context_pool.put_nowait(await self._new_pooled_context())
+        except Exception as e:
+            # The pool would stay a slot short, so drop the browser and let _ensure_browser rebuild both
+            logger.error("Could not replace browser context, restarting the browser: %s", e)
+            await self._discard_browser(context_pool)
+
+    async def _discard_browser(self, context_pool):
+        """Close the browser that owns `context_pool`, unless it has already been replaced"""
+        async with self._browser_lock:
+            if self._context_pool is not context_pool or self._browser is None:
+                return
+            browser = self._browser
+            self._browser = None
+            self._context_pool = None
+
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.warning("Could not close browser: %s", e)
+
+    async def aclose(self):
+        """Release the shared HTTP session, browser and OpenAI connection pool"""
+        await self._parse_calls.aclose()
+
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+            self._context_pool = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+        await self.openai_client.close()
 
     async def render_page(self, url):
         """
         Render a JavaScript page using headless browser
-        Returns the rendered HTML content
+        Returns the rendered text content
         """
+        cached = self._render_cache.get(url)
+        if cached is not None:
+            logger.info("Using cached render for: %s", url)
+            return cached
+
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                context = await browser.new_context()
+            await self._ensure_browser()
+            # Hold on to this pool so the context goes back where it came from
+            context_pool = self._context_pool
+            # Bounded, so a render never hangs on a pool that lost its contexts or was replaced
+            try:
+                context = await asyncio.wait_for(context_pool.get(), timeout=CONTEXT_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                raise Exception(f"No browser context became free within {CONTEXT_WAIT_SECONDS} s")
+            page = None
+            reusable = False
+            try:
                 page = await context.new_page()
+                reusable = True
 
                 # Navigate to the URL
-                await page.goto(url, wait_until='networkidle', timeout=30000)
+                await page.goto(url, wait_until='domcontentloaded', timeout=30000)
 
-                # Wait for content to be rendered
-                await page.wait_for_timeout(2000)
+                # Give scripts a short window to finish rendering the quiz
+                try:
+                    await page.wait_for_load_state('networkidle', timeout=5000)
+                except PlaywrightTimeoutError:
+                    logger.warning("Page did not reach network idle, using current content: %s", url)
 
-                # Get the rendered content
-                content = await page.content()
-
-                # Also get the text content for easier parsing
+                # Only the visible text is used downstream, so skip fetching the HTML
                 text_content = await page.inner_text('body')
 
-                await browser.close()
-
-                return {
-                    'html': content,
+                rendered = {
                     'text': text_content
                 }
+                self._render_cache.put(url, rendered)
+                return rendered
+            finally:
+                if reusable:
+                    try:
+                        await page.evaluate(CLEAR_STORAGE_SCRIPT)
+                        await page.close()
+                        await context.clear_cookies()
+                    except Exception as e:
+                        logger.warning("Could not reset browser context: %s", e)
+                        reusable = False
+
+                if reusable:
+                    context_pool.put_nowait(context)
+                else:
+                    await self._replace_context(context_pool, context)
         except Exception as e:
-            logger.error(f"Error rendering page {url}: {str(e)}")
+            logger.error("Error rendering page %s: %s", url, e)
             raise
 
-    def parse_quiz_with_llm(self, page_content):
+    async def parse_quiz_with_llm(self, page_content):
         """
         Use OpenAI to parse the quiz question and extract:
         - The question text
@@ -60,6 +352,13 @@ class QuizSolver:
         - The submit endpoint URL
         - The expected answer format
         """
+        page_text = _trim_page_text(page_content['text'])
+        cache_key = hashlib.blake2b(page_text.encode('utf-8'), digest_size=16).hexdigest()
+        cached = self._parse_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Using cached quiz parse")
+            return cached
+
         try:
             prompt = f"""
 You are a quiz parser. Extract the following information from this quiz page:
@@ -70,47 +369,352 @@ You are a quiz parser. Extract the following information from this quiz page:
 4. The expected format of the answer (boolean, number, string, object, base64, etc.)
 
 Quiz page content:
-{page_content['text']}
+{page_text}
 
 Return your response as a JSON object with keys: question, file_urls, submit_url, answer_format
 """
 
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that parses quiz questions and extracts structured information."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"}
+            # Concurrent requests for the same page share one call
+            response = await self._parse_calls.submit(
+                cache_key,
+                lambda: self.openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": "You are a helpful assistant that parses quiz questions and extracts structured information."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    response_format={"type": "json_object"}
+                )
             )
 
-            result = json.loads(response.choices[0].message.content)
-            logger.info(f"Parsed quiz: {result}")
+            result = orjson.loads(response.choices[0].message.content)
+            logger.debug("Parsed quiz: %r", result)
+            self._parse_cache.put(cache_key, result)
             return result
 
         except Exception as e:
-            logger.error(f"Error parsing quiz with LLM: {str(e)}")
+            logger.error("Error parsing quiz with LLM: %s", e)
             raise
 
+    def _meta_path(self, url):
+        """Return the path of the on-disk cache metadata for a URL"""
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _content_path(self, content_hash):
+        """Return the path of cached content; files are named by their hash, so they never change"""
+        return os.path.join(self.cache_dir, content_hash + '.bin')
+
+    async def _read_cache_meta(self, url):
+        """Return cached metadata for a URL, or None if there is no readable entry"""
+        meta_path = self._meta_path(url)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            async with aiofiles.open(meta_path, 'rb') as f:
+                meta = orjson.loads(await f.read())
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable cache metadata for %s: %s", url, e)
+            return None
+
+        if not isinstance(meta, dict) or 'content_hash' not in meta:
+            return None
+        return meta
+
+    async def _read_cache_content(self, url, meta):
+        """Return the cached bytes for a URL, or None if they are missing or do not match the metadata"""
+        content_path = self._content_path(meta['content_hash'])
+        try:
+            async with aiofiles.open(content_path, 'rb') as f:
+                content = await f.read()
+        except OSError as e:
+            logger.warning("Ignoring unreadable cached file for %s: %s", url, e)
+            return None
+
+        if len(content) != meta.get('size'):
+            logger.warning("Ignoring cached file for %s: size does not match its metadata", url)
+            return None
+
+        # Touch the file so eviction treats it as recently used
+        try:
+            os.utime(content_path)
+        except OSError:
+            pass
+        return content
+
+    async def _write_atomic(self, path, data):
+        """Write to a unique temporary file, then move it into place in one step"""
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                await f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def _write_cache(self, url, content, meta):
+        """
+        Store a downloaded file
+        Content is written under its own hash first, so replacing the metadata is the
+        single step that commits an entry, even when downloads of one URL overlap
+        """
+        content_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            content_path = self._content_path(content_hash)
+            if not os.path.exists(content_path):
+                await self._write_atomic(content_path, content)
+            await self._write_atomic(self._meta_path(url), orjson.dumps({**meta, 'content_hash': content_hash}))
+            await asyncio.to_thread(self._prune_cache)
+        except OSError as e:
+            logger.warning("Could not cache download for %s: %s", url, e)
+
+    def _prune_cache(self):
+        """
+        Delete the least recently used cached files until the cache fits in MAX_CACHE_BYTES
+        Metadata left pointing at a deleted file just falls back to a normal download
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.bin'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= MAX_CACHE_BYTES:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Another worker may have removed it already
+                pass
+            total -= size
+
+    async def _fetch_file(self, url, meta):
+        """
+        GET a file, revalidating against cached metadata when given
+        Returns None if the server confirmed the cached copy but it could not be read
+        """
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        session = await self._get_session()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and meta:
+                content = await self._read_cache_content(url, meta)
+                if content is None:
+                    return None
+                logger.info("Using cached download for: %s", url)
+                return {
+                    'content': content,
+                    'content_type': meta['content_type']
+                }
+            elif response.status == 200:
+                if response.content_length and response.content_length > MAX_DOWNLOAD_BYTES:
+                    raise Exception(f"File too large: {response.content_length} bytes")
+
+                content = bytearray()
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_BYTES):
+                    content.extend(chunk)
+                    if len(content) > MAX_DOWNLOAD_BYTES:
+                        raise Exception(f"File exceeds {MAX_DOWNLOAD_BYTES} bytes")
+
+                content_type = response.headers.get('Content-Type', '')
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if etag or last_modified:
+                    await self._write_cache(url, content, {
+                        'content_type': content_type,
+                        'etag': etag,
+                        'last_modified': last_modified,
+                        'size': len(content)
+                    })
+
+                return {
+                    'content': content,
+                    'content_type': content_type
+                }
+            else:
+                raise Exception(f"Failed to download file: {response.status}")
+
     async def download_file(self, url):
-        """Download a file from URL and return its content"""
+        """
+        Download a file from URL and return its content
+        The body is streamed into one buffer, capped at MAX_DOWNLOAD_BYTES
+        Files served with an ETag or Last-Modified are cached on disk and revalidated
+        """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        content_type = response.headers.get('Content-Type', '')
-                        return {
-                            'content': content,
-                            'content_type': content_type
-                        }
-                    else:
-                        raise Exception(f"Failed to download file: {response.status}")
+            meta = await self._read_cache_meta(url)
+            file_info = await self._fetch_file(url, meta)
+            if file_info is None:
+                # The cached copy was unusable, so fetch the file again unconditionally
+                file_info = await self._fetch_file(url, None)
+            return file_info
         except Exception as e:
-            logger.error(f"Error downloading file {url}: {str(e)}")
+            logger.error("Error downloading file %s: %s", url, e)
             raise
 
-    def solve_with_llm(self, quiz_info, file_data=None):
+    def _pdf_content(self, content):
+        """
+        Build message parts for a PDF
+        Uses locally extracted text, falling back to page images for scanned PDFs
+        CPU-bound, so callers run it in a worker thread
+        """
+        with _PDFIUM_LOCK:
+            return self._pdf_content_locked(content)
+
+    def _pdf_content_locked(self, content):
+        pdf = pypdfium2.PdfDocument(io.BytesIO(content))
+        try:
+            text = '\n'.join(page.get_textpage().get_text_range() for page in pdf)
+            if len(text.strip()) >= MIN_PDF_TEXT_CHARS:
+                return [{
+                    "type": "text",
+                    "text": f"PDF text:\n{text[:MAX_PDF_TEXT_CHARS]}"
+                }]
+
+            logger.info("PDF has little extractable text, sending page images instead")
+            parts = []
+            for index in range(min(len(pdf), MAX_PDF_IMAGE_PAGES)):
+                image = pdf[index].render(scale=2).to_pil()
+                buffer = io.BytesIO()
+                image.save(buffer, format='PNG')
+                base64_content = pybase64.b64encode(buffer.getvalue()).decode('ascii')
+                parts.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/png;base64,{base64_content}"
+                    }
+                })
+            return parts
+        finally:
+            pdf.close()
+
+    def _csv_content(self, content, question):
+        """
+        Build the message part for a CSV
+        Small files, or questions asking for the full data, get the (truncated) raw text;
+        larger files get their schema, first rows and descriptive statistics
+        CPU-bound, so callers run it in a worker thread
+        """
+        if len(content) <= MAX_RAW_CSV_CHARS or 'full data' in question.lower():
+            text_content = content[:MAX_RAW_CSV_CHARS].decode('utf-8', errors='ignore')
+            return {
+                "type": "text",
+                "text": f"File content:\n{text_content}"
+            }
+
+        try:
+            table = pa_csv.read_csv(io.BytesIO(content))
+        except Exception as e:
+            logger.warning("Could not parse CSV, sending truncated text: %s", e)
+            return {
+                "type": "text",
+                "text": f"File content (truncated):\n{content[:MAX_RAW_CSV_CHARS].decode('utf-8', errors='ignore')}"
+            }
+
+        schema = '\n'.join(f"{field.name}: {field.type}" for field in table.schema)
+        head_buffer = io.BytesIO()
+        pa_csv.write_csv(table.slice(0, CSV_HEAD_ROWS), head_buffer)
+        summary = (
+            f"CSV file with {table.num_rows} rows and {table.num_columns} columns\n\n"
+            f"Columns:\n{schema}\n\n"
+            f"First {min(CSV_HEAD_ROWS, table.num_rows)} rows:\n{head_buffer.getvalue().decode('utf-8')}"
+        )
+
+        # Statistics are computed on the Arrow columns directly, without a second copy of the table
+        stats = []
+        for field, column in zip(table.schema, table.columns):
+            if not (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)):
+                continue
+            min_max = pc.min_max(column)
+            stats.append(
+                f"{field.name},{pc.count(column).as_py()},{pc.sum(column).as_py()},"
+                f"{pc.mean(column).as_py()},{pc.stddev(column, ddof=1).as_py()},"
+                f"{min_max['min'].as_py()},{min_max['max'].as_py()}"
+            )
+        if stats:
+            summary += "\nNumeric column statistics:\ncolumn,count,sum,mean,std,min,max\n" + '\n'.join(stats)
+
+        return {"type": "text", "text": summary}
+
+    def _answer_cache_key(self, quiz_info, file_data):
+        """Digest of everything besides the question that determines the answer"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(quiz_info.get('answer_format')).encode('utf-8'))
+        for file_info in file_data or []:
+            digest.update(hashlib.blake2b(file_info['content'], digest_size=16).digest())
+        return digest.hexdigest()
+
+    async def _embed_question(self, question):
+        """Return the unit-normalised embedding of a question, or None on failure"""
+        try:
+            response = await self.openai_client.embeddings.create(
+                model="text-embedding-3-small",
+                input=question
+            )
+        except Exception as e:
+            logger.warning("Could not embed question, skipping answer cache: %s", e)
+            return None
+
+        embedding = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return embedding / np.linalg.norm(embedding)
+
+    def _lookup_answer(self, cache_key, embedding):
+        """
+        Return (answer, stored embedding) for a near-identical question, if any
+        The stored embedding identifies the entry, since equal answers may be the same object
+        """
+        entry = self._answer_cache.get(cache_key)
+        if entry is None:
+            return None
+
+        embeddings, answers = entry
+        # Rows are normalised on insert, so a dot product is the cosine similarity
+        similarities = np.vstack(embeddings) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] > SEMANTIC_CACHE_THRESHOLD:
+            logger.info("Using cached answer (similarity %.3f)", similarities[best])
+            return answers[best], embeddings[best]
+        return None
+
+    def _store_answer(self, cache_key, embedding, answer):
+        """Remember an answer the grader accepted"""
+        entry = self._answer_cache.get(cache_key)
+        if entry is None:
+            entry = ([], [])
+            self._answer_cache.put(cache_key, entry)
+
+        embeddings, answers = entry
+        embeddings.append(embedding)
+        answers.append(answer)
+        if len(answers) > MAX_ANSWERS_PER_CACHE_KEY:
+            del embeddings[0], answers[0]
+
+    def _discard_answer(self, cache_key, stored_embedding):
+        """Forget the cached answer stored under `stored_embedding`, after the grader rejected it"""
+        entry = self._answer_cache.get(cache_key)
+        if entry is None:
+            return
+
+        embeddings, answers = entry
+        for index, stored in enumerate(embeddings):
+            if stored is stored_embedding:
+                del embeddings[index], answers[index]
+                break
+        if not answers:
+            self._answer_cache.pop(cache_key)
+
+    async def solve_with_llm(self, quiz_info, file_data=None):
         """
         Use OpenAI to solve the quiz question
         Supports vision API for images and PDFs
@@ -133,15 +737,18 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
 
                     # For PDFs and images, use vision API
                     if 'pdf' in content_type.lower() or 'image' in content_type.lower():
-                        base64_content = base64.b64encode(content).decode('utf-8')
-
                         if 'pdf' in content_type.lower():
-                            # For PDFs, convert to images first or use text extraction
-                            user_content.append({
-                                "type": "text",
-                                "text": f"[PDF file content - analyze the data within]"
-                            })
+                            # For PDFs, send extracted text, or page images if it is scanned
+                            try:
+                                user_content.extend(await asyncio.to_thread(self._pdf_content, content))
+                            except Exception as e:
+                                logger.warning("Could not read PDF, sending placeholder: %s", e)
+                                user_content.append({
+                                    "type": "text",
+                                    "text": "[PDF file content - analyze the data within]"
+                                })
                         else:
+                            base64_content = pybase64.b64encode(content).decode('ascii')
                             user_content.append({
                                 "type": "image_url",
                                 "image_url": {
@@ -149,8 +756,14 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
                                 }
                             })
 
+                    # For CSVs, send a compact summary when the file is large
+                    elif 'csv' in content_type.lower():
+                        user_content.append(
+                            await asyncio.to_thread(self._csv_content, content, quiz_info['question'])
+                        )
+
                     # For text-based files
-                    elif 'text' in content_type.lower() or 'csv' in content_type.lower():
+                    elif 'text' in content_type.lower():
                         text_content = content.decode('utf-8')
                         user_content.append({
                             "type": "text",
@@ -159,7 +772,7 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
 
             messages.append({"role": "user", "content": user_content})
 
-            response = self.openai_client.chat.completions.create(
+            response = await self.openai_client.chat.completions.create(
                 model="gpt-4o",
                 messages=messages,
                 max_tokens=2000
@@ -170,11 +783,11 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
             # Try to parse the answer into the appropriate format
             answer = self.format_answer(answer_text, quiz_info.get('answer_format'))
 
-            logger.info(f"LLM answer: {answer}")
+            logger.info("LLM answer: %s", answer)
             return answer
 
         except Exception as e:
-            logger.error(f"Error solving with LLM: {str(e)}")
+            logger.error("Error solving with LLM: %s", e)
             raise
 
     def format_answer(self, answer_text, answer_format):
@@ -189,19 +802,19 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
         try:
             if 'number' in answer_format or 'int' in answer_format:
                 # Extract number from text
-                import re
-                numbers = re.findall(r'-?\d+\.?\d*', answer_text)
+                numbers = _NUM_RE.findall(answer_text)
                 if numbers:
                     return int(float(numbers[0]))
 
             elif 'boolean' in answer_format or 'bool' in answer_format:
                 answer_lower = answer_text.lower()
-                if 'true' in answer_lower or 'yes' in answer_lower:
+                if any(word in answer_lower for word in _TRUE_WORDS):
                     return True
-                elif 'false' in answer_lower or 'no' in answer_lower:
+                elif any(word in answer_lower for word in _FALSE_WORDS):
                     return False
 
             elif 'json' in answer_format or 'object' in answer_format:
+                # json keeps integers of any size exact, unlike orjson
                 return json.loads(answer_text)
         except:
             pass
@@ -221,16 +834,60 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
                 "answer": answer
             }
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(submit_url, json=payload, timeout=30) as response:
-                    result = await response.json()
-                    logger.info(f"Submission result: {result}")
-                    return result
+            session = await self._get_session()
+            async with session.post(submit_url, json=payload) as response:
+                result = await response.json(loads=orjson.loads)
+                logger.info("Submission result: %s", result)
+                return result
 
         except Exception as e:
-            logger.error(f"Error submitting answer: {str(e)}")
+            logger.error("Error submitting answer: %s", e)
             raise
 
+    async def _solve_and_submit(self, email, secret, url, quiz_info, file_data):
+        """
+        Solve the quiz and submit the answer, reusing an accepted answer to a near-identical question
+        A reused answer the grader rejects is dropped and the quiz is solved and resubmitted once
+        """
+        cache_key = self._answer_cache_key(quiz_info, file_data)
+        # The embedding only blocks solving when there are cached answers to compare against
+        embed_task = asyncio.create_task(self._embed_question(quiz_info['question']))
+        try:
+            cached = None
+            if self._answer_cache.get(cache_key) is not None:
+                embedding = await embed_task
+                if embedding is not None:
+                    cached = self._lookup_answer(cache_key, embedding)
+
+            if cached is not None:
+                answer = cached[0]
+            else:
+                logger.info("Solving quiz with LLM")
+                answer = await self.solve_with_llm(quiz_info, file_data)
+
+            logger.info("Submitting answer: %s", answer)
+            submit_url = quiz_info.get('submit_url')
+            result = await self.submit_answer(submit_url, email, secret, url, answer)
+
+            if cached is not None:
+                if result.get('correct'):
+                    return result
+                logger.warning("Cached answer was rejected, solving with LLM instead")
+                self._discard_answer(cache_key, cached[1])
+                answer = await self.solve_with_llm(quiz_info, file_data)
+                logger.info("Resubmitting answer: %s", answer)
+                result = await self.submit_answer(submit_url, email, secret, url, answer)
+
+            # Only answers the grader accepted are worth reusing
+            if result.get('correct'):
+                embedding = await embed_task
+                if embedding is not None:
+                    self._store_answer(cache_key, embedding, answer)
+            return result
+        finally:
+            if not embed_task.done():
+                embed_task.cancel()
+
     async def solve_single_quiz(self, email, secret, url):
         """
         Solve a single quiz question
@@ -238,34 +895,32 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
         """
         try:
             # Step 1: Render the page
-            logger.info(f"Rendering quiz page: {url}")
+            logger.info("Rendering quiz page: %s", url)
             page_content = await self.render_page(url)
 
             # Step 2: Parse the quiz with LLM
             logger.info("Parsing quiz question")
-            quiz_info = self.parse_quiz_with_llm(page_content)
+            quiz_info = await self.parse_quiz_with_llm(page_content)
 
             # Step 3: Download any required files
             file_data = []
             if quiz_info.get('file_urls'):
-                logger.info(f"Downloading files: {quiz_info['file_urls']}")
-                for file_url in quiz_info['file_urls']:
-                    file_content = await self.download_file(file_url)
-                    file_data.append(file_content)
+                logger.info("Downloading files: %s", quiz_info['file_urls'])
+                file_data = await asyncio.gather(
+                    *(self.download_file(file_url) for file_url in quiz_info['file_urls'])
+                )
 
-            # Step 4: Solve the quiz with LLM
-            logger.info("Solving quiz with LLM")
-            answer = self.solve_with_llm(quiz_info, file_data)
+            # Steps 4 and 5: Solve the quiz and submit the answer
+            result = await self._solve_and_submit(email, secret, url, quiz_info, file_data)
 
-            # Step 5: Submit the answer
-            logger.info(f"Submitting answer: {answer}")
-            submit_url = quiz_info.get('submit_url')
-            result = await self.submit_answer(submit_url, email, secret, url, answer)
+            # A rejected quiz may be posted again, so render it afresh next time
+            if not result.get('correct'):
+                self._render_cache.pop(url)
 
             return result
 
         except Exception as e:
-            logger.error(f"Error solving quiz {url}: {str(e)}")
+            logger.error("Error solving quiz %s: %s", url, e)
             raise
 
     async def solve_quiz_chain(self, email, secret, initial_url):
@@ -278,7 +933,7 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
 
         while current_url and (time.time() - start_time) < self.max_time:
             try:
-                logger.info(f"Solving quiz: {current_url}")
+                logger.info("Solving quiz: %s", current_url)
                 result = await self.solve_single_quiz(email, secret, current_url)
                 results.append(result)
 
@@ -286,7 +941,7 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
                 if result.get('correct'):
                     next_url = result.get('url')
                     if next_url:
-                        logger.info(f"Moving to next quiz: {next_url}")
+                        logger.info("Moving to next quiz: %s", next_url)
                         current_url = next_url
                     else:
                         logger.info("Quiz chain completed!")
@@ -294,19 +949,19 @@ Return your response as a JSON object with keys: question, file_urls, submit_url
                 else:
                     # If incorrect, we can retry if we have time
                     reason = result.get('reason', 'Unknown error')
-                    logger.warning(f"Answer was incorrect: {reason}")
+                    logger.warning("Answer was incorrect: %s", reason)
 
                     # Check if there's a next URL to skip to
                     next_url = result.get('url')
                     if next_url:
-                        logger.info(f"Skipping to next quiz: {next_url}")
+                        logger.info("Skipping to next quiz: %s", next_url)
                         current_url = next_url
                     else:
                         break
 
             except Exception as e:
-                logger.error(f"Error in quiz chain: {str(e)}")
+                logger.error("Error in quiz chain: %s", e)
                 break
 
-        logger.info(f"Quiz chain completed. Total results: {len(results)}")
+        logger.info("Quiz chain completed. Total results: %d", len(results))
         return results